@@ -1,12 +1,18 @@
-import re
-import sqlite3
+import html
 import logging
-from datetime import datetime
+import signal
+from contextlib import AsyncExitStack
+from collections import deque
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, CallbackContext, CallbackQueryHandler
 from pyrogram import Client, filters
 from pyrogram.types import Message
 import asyncio
+import aiosqlite
 import config
 
 # Set up logging
@@ -16,27 +22,261 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize database
-def init_db():
-    conn = sqlite3.connect(config.DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS media_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message_id INTEGER,
-            file_type TEXT,
-            title TEXT,
-            course TEXT,
-            extracted_by TEXT,
-            file_id TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+# Caption field prefixes, each value runs from its prefix to the end of the line
+_VIDEO_TITLE_PREFIX = "🎞️𝐓𝐢𝐭𝐥𝐞 »"
+_PDF_TITLE_PREFIX = "📕𝐓𝐢𝐭𝐥𝐞 »"
+_COURSE_PREFIX = "📚 Course :"
+_EXTRACTED_BY_PREFIX = "🌟𝐄𝐱𝐭𝐫𝐚𝐜𝐭𝐞𝐝 𝐁𝐲 »"
+# Shared by both title prefixes, captions without it are skipped
+_TITLE_MARKER = "𝐓𝐢𝐭𝐥𝐞 »"
+
+# Channel inserts are flushed in batches of up to WRITE_BATCH_SIZE rows,
+# waiting at most WRITE_BATCH_DELAY seconds for a batch to fill up
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_DELAY = 0.2
+
+# Telegram allows about one message per second and 20 messages per minute
+# to a group or channel, posts to the channel are spaced to stay under both
+SEND_INTERVAL = 1.0
+SEND_PER_MINUTE = 20
+
+# Number of files listed per page by /get_videos and /get_pdfs
+PAGE_SIZE = 20
+# Telegram rejects messages over 4096 characters, so a page stops adding
+# files before MAX_MESSAGE_LENGTH and long caption values are shortened
+MAX_MESSAGE_LENGTH = 4000
+MAX_FIELD_LENGTH = 200
+
+# Link prefix for posts in the monitored channel
+_TME_PREFIX = f"https://t.me/{config.CHANNEL_USERNAME}/"
+# Header shown above each page of the file listings
+PAGE_HEADERS = {
+    "video": "🎥 <b>All Videos</b>",
+    "pdf": "📄 <b>All PDFs</b>",
+}
+# Page buttons carry "<kind>:<offset>" as callback data, keeping it well
+# under Telegram's 64 byte limit
+PAGE_CALLBACK_KINDS = {
+    "video": "v",
+    "pdf": "p",
+}
+CALLBACK_FILE_TYPES = {kind: file_type for file_type, kind in PAGE_CALLBACK_KINDS.items()}
+
+def message_length(text):
+    """Length of text as Telegram counts it, in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+def shorten(text, limit=MAX_FIELD_LENGTH):
+    """Cut text down to at most limit characters"""
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+class Database:
+    """Shared SQLite connection used by both the channel monitor and the bot"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        # Keeps multi-statement writes from interleaving on the shared connection
+        self.write_lock = asyncio.Lock()
+    
+    async def connect(self):
+        """Open the connection on first use"""
+        if self.conn is None:
+            self.conn = await aiosqlite.connect(self.path)
+            await self.conn.execute("PRAGMA journal_mode=WAL")
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
+            await self.conn.execute("PRAGMA temp_store=MEMORY")
+            await self.conn.execute("PRAGMA cache_size=-64000")
+        return self.conn
+    
+    async def ensure_schema(self):
+        """Create tables and indexes if they do not exist yet"""
+        conn = await self.connect()
+        async with self.write_lock:
+            await conn.execute("BEGIN")
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS media_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message_id INTEGER,
+                    file_type TEXT,
+                    title TEXT,
+                    course TEXT,
+                    extracted_by TEXT,
+                    file_id TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Matches the page order, including the id tie-breaker
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_mf_type_ts_id
+                ON media_files (file_type, timestamp DESC, id DESC)
+            ''')
+            await conn.execute("DROP INDEX IF EXISTS idx_mf_type_ts")
+            # Lets the summary read the latest files of each course directly
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_mf_course_type_ts_id
+                ON media_files (course, file_type, timestamp DESC, id DESC)
+            ''')
+            # No query orders the whole table by timestamp any more
+            await conn.execute("DROP INDEX IF EXISTS idx_mf_ts")
+            
+            # Per course and file type totals, kept current by a trigger
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS media_stats (
+                    course TEXT,
+                    file_type TEXT,
+                    cnt INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (course, file_type)
+                )
+            ''')
+            await conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_media_stats_insert
+                AFTER INSERT ON media_files
+                BEGIN
+                    INSERT INTO media_stats (course, file_type, cnt)
+                    VALUES (NEW.course, NEW.file_type, 1)
+                    ON CONFLICT (course, file_type) DO UPDATE SET cnt = cnt + 1;
+                END
+            ''')
+            # Backfill totals for files stored before media_stats existed
+            await conn.execute('''
+                INSERT INTO media_stats (course, file_type, cnt)
+                SELECT course, file_type, COUNT(*)
+                FROM media_files
+                WHERE NOT EXISTS (SELECT 1 FROM media_stats)
+                GROUP BY course, file_type
+            ''')
+            await conn.commit()
+            
+            # Refresh planner statistics for tables whose stats are missing
+            # or stale, close() repeats this once real queries have run
+            await conn.execute("PRAGMA optimize=0x10002")
+    
+    async def execute(self, sql, params=()):
+        """Run a read query and return all resulting rows"""
+        conn = await self.connect()
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+    
+    async def executemany(self, sql, rows):
+        """Run a write statement for every row in a single transaction"""
+        conn = await self.connect()
+        async with self.write_lock:
+            try:
+                await conn.executemany(sql, rows)
+                await conn.commit()
+            except Exception:
+                # Don't leave a half written batch for the next commit
+                await conn.rollback()
+                raise
+    
+    async def close(self):
+        """Close the connection if it is open"""
+        if self.conn is not None:
+            try:
+                await self.conn.execute("PRAGMA optimize")
+            finally:
+                await self.conn.close()
+                self.conn = None
+
+# Database handle shared by the whole process
+DB = Database(config.DB_FILE)
+
+class SendQueue:
+    """Rate limited queue for messages posted to the channel"""
+    
+    def __init__(self, bot, interval=SEND_INTERVAL, per_minute=SEND_PER_MINUTE):
+        self.bot = bot
+        self.interval = interval
+        self.per_minute = per_minute
+        self._queue = asyncio.Queue()
+        # Send times within the last minute, oldest first
+        self._sent = deque()
+        self._worker_task = None
+        # Future of the message the worker is currently sending
+        self._current = None
+    
+    def start(self):
+        """Start the worker that sends queued messages"""
+        self._worker_task = asyncio.create_task(self._worker())
+    
+    async def stop(self):
+        """Stop the worker, cancelling any messages still queued"""
+        if self._worker_task:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        
+        # Release callers still waiting in send()
+        pending = [self._current] if self._current else []
+        self._current = None
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait()[3])
+        for future in pending:
+            future.cancel()
+    
+    async def send(self, chat_id, text, **kwargs):
+        """Queue a message and wait until it has been sent"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((chat_id, text, kwargs, future))
+        return await future
+    
+    async def _wait_for_slot(self):
+        """Sleep until sending another message stays within the limits"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._sent and now - self._sent[0] >= 60:
+                self._sent.popleft()
+            
+            delay = 0
+            if self._sent:
+                delay = self._sent[-1] + self.interval - now
+            if len(self._sent) >= self.per_minute:
+                delay = max(delay, self._sent[0] + 60 - now)
+            
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+    
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            chat_id, text, kwargs, future = await self._queue.get()
+            self._current = future
+            
+            # Retry until sent, failed, or the caller stopped waiting
+            while not future.done():
+                await self._wait_for_slot()
+                try:
+                    result = await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                except RetryAfter as e:
+                    # Park the whole queue for as long as Telegram asks
+                    retry_after = e.retry_after
+                    if isinstance(retry_after, timedelta):
+                        retry_after = retry_after.total_seconds()
+                    logger.warning(f"Flood limit hit, retrying in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+                    continue
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    # Only delivered messages count towards the limits
+                    self._sent.append(loop.time())
+                    if not future.done():
+                        future.set_result(result)
+            self._current = None
 
 class ChannelMonitor:
-    def __init__(self):
+    def __init__(self, on_store=None):
+        # Called after every flush attempt so readers can drop stale data
+        self.on_store = on_store
+        self._write_queue = asyncio.Queue()
+        self._writer_task = None
         self.pyro_client = Client(
             "channel_monitor",
             api_id=config.API_ID,
@@ -54,85 +294,135 @@ class ChannelMonitor:
         """Process messages from the channel and extract media information"""
         
         # Check if message contains video or document
-        if message.video or message.document:
-            caption = message.caption if message.caption else ""
-            
-            # Extract information using regex patterns
-            title = self.extract_title(caption)
-            course = self.extract_course(caption)
-            extracted_by = self.extract_extracted_by(caption)
-            
-            if title:
-                file_type = "video" if message.video else "pdf"
-                file_id = message.video.file_id if message.video else message.document.file_id
-                
-                # Store in database
-                self.store_media_data(
-                    message_id=message.id,
-                    file_type=file_type,
-                    title=title,
-                    course=course,
-                    extracted_by=extracted_by,
-                    file_id=file_id
-                )
-                
-                logger.info(f"Stored {file_type}: {title}")
-    
-    def extract_title(self, caption):
-        """Extract title from caption"""
-        # Pattern for video title
-        video_pattern = r"🎞️𝐓𝐢𝐭𝐥𝐞 »\s*([^\n]+)"
-        # Pattern for PDF title
-        pdf_pattern = r"📕𝐓𝐢𝐭𝐥𝐞 »\s*([^\n]+)"
-        
-        video_match = re.search(video_pattern, caption)
-        pdf_match = re.search(pdf_pattern, caption)
-        
-        if video_match:
-            return video_match.group(1).strip()
-        elif pdf_match:
-            return pdf_match.group(1).strip()
-        return None
+        video = message.video
+        document = message.document
+        if not (video or document):
+            return
+        
+        caption = message.caption or ""
+        
+        # Skip captions that cannot contain a title before parsing
+        if _TITLE_MARKER not in caption:
+            return
+        
+        # Extract information from the caption fields
+        title, course, extracted_by = self.parse_caption(caption)
+        if not title:
+            return
+        
+        # Only look up file details for messages that will be stored
+        file_type = "video" if video else "pdf"
+        file_id = video.file_id if video else document.file_id
+        
+        # Store in database
+        self.store_media_data(
+            message_id=message.id,
+            file_type=file_type,
+            title=title,
+            course=course,
+            extracted_by=extracted_by,
+            file_id=file_id
+        )
+        
+        logger.info(f"Queued {file_type}: {title}")
     
-    def extract_course(self, caption):
-        """Extract course information"""
-        course_pattern = r"📚 Course :\s*([^\n]+)"
-        match = re.search(course_pattern, caption)
-        return match.group(1).strip() if match else "Unknown"
+    def parse_caption(self, caption):
+        """Extract title, course and extracted by information from caption"""
+        # Video title takes precedence over PDF title
+        title = (self.extract_field(caption, _VIDEO_TITLE_PREFIX)
+                 or self.extract_field(caption, _PDF_TITLE_PREFIX))
+        course = self.extract_field(caption, _COURSE_PREFIX) or "Unknown"
+        extracted_by = self.extract_field(caption, _EXTRACTED_BY_PREFIX) or "Unknown"
+        return title, course, extracted_by
     
-    def extract_extracted_by(self, caption):
-        """Extract extracted by information"""
-        extracted_pattern = r"🌟𝐄𝐱𝐭𝐫𝐚𝐜𝐭𝐞𝐝 𝐁𝐲 »\s*([^\n]+)"
-        match = re.search(extracted_pattern, caption)
-        return match.group(1).strip() if match else "Unknown"
+    def extract_field(self, caption, prefix):
+        """Return the text after the first occurrence of prefix up to the end of its line"""
+        start = caption.find(prefix)
+        if start < 0:
+            return None
+        
+        # Skip whitespace after the prefix, which may include line breaks
+        start += len(prefix)
+        end = len(caption)
+        while start < end and caption[start].isspace():
+            start += 1
+        
+        line_end = caption.find("\n", start)
+        return caption[start:line_end if line_end >= 0 else end].strip() or None
     
     def store_media_data(self, message_id, file_type, title, course, extracted_by, file_id):
-        """Store media data in SQLite database"""
-        conn = sqlite3.connect(config.DB_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO media_files 
+        """Queue media data to be written to the SQLite database"""
+        self._write_queue.put_nowait(
             (message_id, file_type, title, course, extracted_by, file_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (message_id, file_type, title, course, extracted_by, file_id))
+        )
+    
+    async def flush_media_data(self, rows):
+        """Insert a batch of media rows in a single transaction"""
+        try:
+            await DB.executemany('''
+                INSERT INTO media_files 
+                (message_id, file_type, title, course, extracted_by, file_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            logger.info(f"Stored {len(rows)} media files")
+        finally:
+            # Reads share the connection and may have cached rows from this
+            # batch before it was committed or rolled back
+            if self.on_store:
+                self.on_store()
+    
+    async def _writer_loop(self):
+        """Drain the write queue in batches until a None sentinel arrives"""
+        loop = asyncio.get_running_loop()
+        running = True
         
-        conn.commit()
-        conn.close()
+        while running:
+            rows = []
+            row = await self._write_queue.get()
+            deadline = loop.time() + WRITE_BATCH_DELAY
+            
+            while row is not None:
+                rows.append(row)
+                timeout = deadline - loop.time()
+                if len(rows) >= WRITE_BATCH_SIZE or timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            
+            if row is None:
+                running = False
+            if rows:
+                # A failed batch is dropped, later batches are still written
+                try:
+                    await self.flush_media_data(rows)
+                except Exception:
+                    logger.exception(f"Failed to store {len(rows)} media files")
     
     async def start_monitoring(self):
         """Start monitoring the channel"""
+        self._writer_task = asyncio.create_task(self._writer_loop())
         await self.pyro_client.start()
         logger.info("Channel monitoring started...")
     
     async def stop_monitoring(self):
         """Stop monitoring the channel"""
         await self.pyro_client.stop()
+        
+        # Flush whatever is still queued before returning
+        if self._writer_task:
+            self._write_queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
 
 class TelegramBot:
     def __init__(self):
         self.application = Application.builder().token(config.BOT_TOKEN).build()
-        self.channel_monitor = ChannelMonitor()
+        self.send_queue = SendQueue(self.application.bot)
+        # Query results, cleared whenever the channel monitor stores new files
+        self._cache = {}
+        self.channel_monitor = ChannelMonitor(on_store=self._cache.clear)
         self.setup_handlers()
     
     def setup_handlers(self):
@@ -156,26 +446,80 @@ class TelegramBot:
             "/get_pdfs - Get list of all PDFs"
         )
     
-    def get_media_files(self, file_type=None):
-        """Retrieve media files from database"""
-        conn = sqlite3.connect(config.DB_FILE)
-        cursor = conn.cursor()
+    async def get_media_page(self, file_type, offset, limit=PAGE_SIZE):
+        """Retrieve one page of media files and whether more pages follow"""
+        key = (file_type, offset, limit)
+        if key in self._cache:
+            return self._cache[key]
         
-        if file_type:
-            cursor.execute('''
-                SELECT * FROM media_files 
-                WHERE file_type = ? 
-                ORDER BY timestamp DESC
-            ''', (file_type,))
-        else:
-            cursor.execute('''
-                SELECT * FROM media_files 
-                ORDER BY timestamp DESC
-            ''')
+        # Fetch one extra row to find out if there is a next page
+        results = await DB.execute('''
+            SELECT message_id, file_type, title, course FROM media_files 
+            WHERE file_type = ? 
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ? OFFSET ?
+        ''', (file_type, limit + 1, offset))
+        
+        page = (results[:limit], len(results) > limit)
+        self._cache[key] = page
+        return page
+    
+    def format_media_page(self, file_type, files, offset, has_next):
+        """Build the text and navigation buttons for one page of media files"""
+        response_parts = [f"{PAGE_HEADERS[file_type]}\n\n"]
+        length = message_length(response_parts[0])
+        shown = 0
+        for file in files:
+            message_id = file[0]
+            title = shorten(file[2])
+            course = shorten(file[3])
+            entry = (
+                f'• <a href="{_TME_PREFIX}{message_id}">{html.escape(title)}</a>\n'
+                f"  Course: {html.escape(course)}\n\n"
+            )
+            
+            # Always show at least one file so paging makes progress
+            entry_length = message_length(entry)
+            if shown and length + entry_length > MAX_MESSAGE_LENGTH:
+                break
+            response_parts.append(entry)
+            length += entry_length
+            shown += 1
+        response = "".join(response_parts)
+        
+        kind = PAGE_CALLBACK_KINDS[file_type]
+        buttons = []
+        if offset > 0:
+            prev_offset = max(offset - PAGE_SIZE, 0)
+            buttons.append(InlineKeyboardButton("Previous", callback_data=f"{kind}:{prev_offset}"))
+        if has_next or shown < len(files):
+            buttons.append(InlineKeyboardButton("Next", callback_data=f"{kind}:{offset + shown}"))
+        reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
         
-        results = cursor.fetchall()
-        conn.close()
+        return response, reply_markup
+    
+    async def get_summary_rows(self, per_type=5):
+        """Retrieve the latest files of each type per course from database"""
+        key = ("__summary__", per_type)
+        if key in self._cache:
+            return self._cache[key]
+        
+        # Walk the course totals in media_stats and look up only the latest
+        # files of each one, so the cost does not grow with the table size.
+        # Videos are listed before PDFs within each course.
+        results = await DB.execute('''
+            SELECT s.course, s.file_type, f.title, f.message_id, s.cnt
+            FROM media_stats s
+            JOIN media_files f ON f.id IN (
+                SELECT id FROM media_files
+                WHERE course = s.course AND file_type = s.file_type
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            )
+            ORDER BY s.course, s.file_type DESC, f.timestamp DESC, f.id DESC
+        ''', (per_type,))
         
+        self._cache[key] = results
         return results
     
     async def post_summary(self, update: Update, context: CallbackContext):
@@ -184,52 +528,37 @@ class TelegramBot:
             await update.message.reply_text("You are not authorized to use this command.")
             return
         
-        # Get all media files
-        media_files = self.get_media_files()
+        # Get the latest 5 videos and PDFs of each course
+        summary_rows = await self.get_summary_rows()
         
-        if not media_files:
+        if not summary_rows:
             await update.message.reply_text("No media files found in database.")
             return
         
-        # Organize by course
-        organized_data = {}
-        for file in media_files:
-            course = file[4]  # course column
-            if course not in organized_data:
-                organized_data[course] = []
-            organized_data[course].append(file)
+        # Create summary message, rows arrive grouped by course and file type
+        summary_parts = ["📚 <b>Course Materials Summary</b>\n\n"]
         
-        # Create summary message
-        summary_text = "📚 **Course Materials Summary**\n\n"
-        
-        for course, files in organized_data.items():
-            summary_text += f"**{course}**\n"
-            
-            videos = [f for f in files if f[2] == "video"]  # file_type column
-            pdfs = [f for f in files if f[2] == "pdf"]
-            
-            if videos:
-                summary_text += "🎥 **Videos:**\n"
-                for video in videos[:5]:  # Show first 5 videos
-                    title = video[3]  # title column
-                    message_id = video[1]  # message_id column
-                    summary_text += f"• [{title}](https://t.me/{config.CHANNEL_USERNAME}/{message_id})\n"
+        for course, course_rows in groupby(summary_rows, key=itemgetter(0)):
+            summary_parts.append(f"<b>{html.escape(course)}</b>\n")
             
-            if pdfs:
-                summary_text += "📄 **PDFs:**\n"
-                for pdf in pdfs[:5]:  # Show first 5 PDFs
-                    title = pdf[3]  # title column
-                    message_id = pdf[1]  # message_id column
-                    summary_text += f"• [{title}](https://t.me/{config.CHANNEL_USERNAME}/{message_id})\n"
+            for (file_type, count), type_rows in groupby(course_rows, key=itemgetter(1, 4)):
+                if file_type == "video":
+                    summary_parts.append(f"🎥 <b>Videos ({count}):</b>\n")
+                else:
+                    summary_parts.append(f"📄 <b>PDFs ({count}):</b>\n")
+                for _, _, title, message_id, _ in type_rows:
+                    summary_parts.append(f'• <a href="{_TME_PREFIX}{message_id}">{html.escape(title)}</a>\n')
             
-            summary_text += "\n"
+            summary_parts.append("\n")
+        
+        summary_text = "".join(summary_parts)
         
         # Post to channel
         try:
-            await context.bot.send_message(
-                chat_id=f"@{config.CHANNEL_USERNAME}",
-                text=summary_text,
-                parse_mode='Markdown',
+            await self.send_queue.send(
+                f"@{config.CHANNEL_USERNAME}",
+                summary_text,
+                parse_mode='HTML',
                 disable_web_page_preview=True
             )
             await update.message.reply_text("Summary posted successfully!")
@@ -242,25 +571,23 @@ class TelegramBot:
             await update.message.reply_text("You are not authorized to use this command.")
             return
         
-        videos = self.get_media_files("video")
+        videos, has_next = await self.get_media_page("video", 0)
         
         if not videos:
             await update.message.reply_text("No videos found in database.")
             return
         
-        response = "🎥 **All Videos**\n\n"
-        for video in videos:
-            title = video[3]
-            course = video[4]
-            message_id = video[1]
-            response += f"• [{title}](https://t.me/{config.CHANNEL_USERNAME}/{message_id})\n"
-            response += f"  Course: {course}\n\n"
+        response, reply_markup = self.format_media_page("video", videos, 0, has_next)
         
-        await update.message.reply_text(
-            response,
-            parse_mode='Markdown',
-            disable_web_page_preview=True
-        )
+        try:
+            await update.message.reply_text(
+                response,
+                parse_mode='HTML',
+                disable_web_page_preview=True,
+                reply_markup=reply_markup
+            )
+        except Exception as e:
+            await update.message.reply_text(f"Error listing videos: {e}")
     
     async def get_pdfs(self, update: Update, context: CallbackContext):
         """Get list of all PDFs"""
@@ -268,48 +595,95 @@ class TelegramBot:
             await update.message.reply_text("You are not authorized to use this command.")
             return
         
-        pdfs = self.get_media_files("pdf")
+        pdfs, has_next = await self.get_media_page("pdf", 0)
         
         if not pdfs:
             await update.message.reply_text("No PDFs found in database.")
             return
         
-        response = "📄 **All PDFs**\n\n"
-        for pdf in pdfs:
-            title = pdf[3]
-            course = pdf[4]
-            message_id = pdf[1]
-            response += f"• [{title}](https://t.me/{config.CHANNEL_USERNAME}/{message_id})\n"
-            response += f"  Course: {course}\n\n"
+        response, reply_markup = self.format_media_page("pdf", pdfs, 0, has_next)
         
-        await update.message.reply_text(
-            response,
-            parse_mode='Markdown',
-            disable_web_page_preview=True
-        )
+        try:
+            await update.message.reply_text(
+                response,
+                parse_mode='HTML',
+                disable_web_page_preview=True,
+                reply_markup=reply_markup
+            )
+        except Exception as e:
+            await update.message.reply_text(f"Error listing PDFs: {e}")
     
     async def button_handler(self, update: Update, context: CallbackContext):
         """Handle button clicks"""
         query = update.callback_query
         await query.answer()
         
+        if update.effective_user.id != config.ADMIN_ID:
+            return
+        
         # Extract data from callback data
-        data = query.data
-        if data.startswith("video_"):
-            message_id = data.replace("video_", "")
-            # You can implement specific actions here
+        kind, _, offset = query.data.partition(":")
+        file_type = CALLBACK_FILE_TYPES.get(kind)
+        if file_type:
+            offset = int(offset)
+            
+            files, has_next = await self.get_media_page(file_type, offset)
+            if not files:
+                return
+            
+            response, reply_markup = self.format_media_page(file_type, files, offset, has_next)
+            try:
+                await query.edit_message_text(
+                    response,
+                    parse_mode='HTML',
+                    disable_web_page_preview=True,
+                    reply_markup=reply_markup
+                )
+            except Exception as e:
+                logger.warning(f"Error showing {file_type} page at offset {offset}: {e}")
     
     async def run(self):
-        """Start the bot"""
-        init_db()
-        
-        # Start channel monitoring
-        asyncio.create_task(self.channel_monitor.start_monitoring())
-        
-        # Start the bot
-        await self.application.run_polling()
+        """Start the bot and run until SIGINT or SIGTERM"""
+        # Shutdown steps run in reverse order, each one even if an earlier one fails
+        async with AsyncExitStack() as stack:
+            stack.push_async_callback(DB.close)
+            await DB.ensure_schema()
+            
+            self.send_queue.start()
+            stack.push_async_callback(self.send_queue.stop)
+            
+            # Start channel monitoring
+            await self.channel_monitor.start_monitoring()
+            stack.push_async_callback(self.channel_monitor.stop_monitoring)
+            
+            # Start the bot on the same event loop as the channel monitor
+            await self.application.initialize()
+            stack.push_async_callback(self.application.shutdown)
+            await self.application.start()
+            stack.push_async_callback(self.application.stop)
+            await self.application.updater.start_polling()
+            stack.push_async_callback(self.application.updater.stop)
+            
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop_event.set)
+                except NotImplementedError:
+                    # Not available on Windows, Ctrl+C cancels this task instead
+                    pass
+            
+            await stop_event.wait()
+
+async def main():
+    # Build the bot inside the running loop, the Pyrogram client binds to
+    # whatever loop is current when it is created
+    bot = TelegramBot()
+    await bot.run()
 
 # Main execution
 if __name__ == "__main__":
-    bot = TelegramBot()
-    asyncio.run(bot.run())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass